@@ -0,0 +1,205 @@
+# ============================================================================
+# RERUN LATENCY HARNESS
+# Drives each page headlessly with Streamlit's AppTest API and reports
+# rerun latency percentiles against a fixed budget.
+#
+#   python rerun_benchmark.py --rows 200000 --budget-ms 300
+#
+# The batch page's upload grows with --rows unless --upload-rows is given.
+# Every page opens with empty caches, so "Cold" includes the first scoring pass.
+# ============================================================================
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'streamlit_app.py')
+
+DASHBOARD = "📉 Analytics Dashboard 💡 Recommendations"
+BATCH = "📈 Batch Scoring"
+CALCULATOR = "💰 Interest Rate Calculator"
+REPORT = "🏦 Portfolio Risk Report"
+
+# ============================================================================
+# SYNTHETIC DATA
+# ============================================================================
+
+def make_portfolio(rows, seed=0):
+    """Generate a synthetic portfolio with the columns the app expects"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Customer_ID': [f"CUS_{i:07d}" for i in range(rows)],
+        'Name': [f"Customer {i % 50000}" for i in range(rows)],
+        'Num_of_Delayed_Payment': rng.poisson(2, rows),
+        'Delay_from_due_date': rng.integers(-5, 60, rows),
+        'Payment_of_Min_Amount': rng.integers(0, 2, rows),
+        'Credit_Utilization_Ratio': rng.uniform(15, 50, rows).round(2),
+        'Credit_History_Age_Years': rng.uniform(0, 30, rows).round(1),
+        'Credit_Mix': rng.choice(['Good', 'Standard', 'Bad'], rows, p=[0.3, 0.5, 0.2]),
+        'Num_Credit_Inquiries': rng.poisson(5, rows),
+        'Annual_Income': rng.lognormal(13, 0.6, rows).round(0),
+        'Outstanding_Debt': rng.lognormal(11.5, 1.0, rows).round(0),
+        'Type_of_Loan': rng.choice(
+            ['Personal Loan', 'Auto Loan', 'Student Loan', 'Mortgage Loan, Auto Loan', 'Payday Loan'],
+            rows
+        )
+    })
+
+# ============================================================================
+# SCRIPTED INTERACTIONS
+# ============================================================================
+
+def widget(elements, label):
+    """Find a widget by its label"""
+    return next(element for element in elements if element.label == label)
+
+def timed_run(at):
+    """Rerun the app and return the elapsed time in milliseconds"""
+    start = time.perf_counter()
+    at.run()
+    elapsed = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return elapsed
+
+def open_page(page, timeout, state=None):
+    """Start a fresh session with empty caches on the given page; returns (app, cold start ms)"""
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    for key, value in (state or {}).items():
+        at.session_state[key] = value
+    cold = timed_run(at)
+    if at.sidebar.radio[0].value != page:
+        at.sidebar.radio[0].set_value(page)
+        cold += timed_run(at)
+    return at, cold
+
+# Each driver returns (one-off cold ms, per-rerun latencies in ms)
+
+def first_paint_ms():
+    """Time from reading the dataset to the first progressive KPI estimate"""
+    from streamlit_app import progressive_kpis
+    start = time.perf_counter()
+    next(progressive_kpis(pd.read_csv(os.path.join('data', 'preprocessed_data.csv'))))
+    return (time.perf_counter() - start) * 1000
+
+def drive_dashboard(at, interactions):
+    """Check the cold load went through the progressive pass, then switch customers and toggle modes"""
+    metrics = [metric.label for metric in at.metric]
+    if "👥 Processed" not in metrics:
+        raise RuntimeError("cold dashboard load skipped the progressive pass")
+    names = widget(at.selectbox, "🔍 Select Customer").options
+
+    latencies = []
+    for i in range(interactions):
+        if i % 10 == 9:
+            toggle = at.toggle[0]
+            toggle.set_value(not toggle.value)
+        else:
+            widget(at.selectbox, "🔍 Select Customer").set_value(names[(i * 7919) % len(names)])
+        latencies.append(timed_run(at))
+    return 0, latencies
+
+def drive_calculator(at, interactions):
+    """Move the sliders and change the loan details"""
+    loan_types = ['Personal Loan', 'Housing Loan', 'Auto Loan', 'Student Loan']
+    latencies = []
+    for i in range(interactions):
+        step = i % 4
+        if step == 0:
+            widget(at.slider, "Credit Score").set_value(300 + (i * 37) % 551)
+        elif step == 1:
+            widget(at.slider, "Loan Tenure (months)").set_value(12 + (i * 29) % 349)
+        elif step == 2:
+            widget(at.selectbox, "Loan Type").set_value(loan_types[i % len(loan_types)])
+        else:
+            widget(at.number_input, "Loan Amount (₹)").set_value(100000 + (i * 10000) % 900000)
+        latencies.append(timed_run(at))
+    return 0, latencies
+
+def drive_report(at, interactions):
+    """Move the LGD and EMI tenure sliders over the default dataset"""
+    latencies = []
+    for i in range(interactions):
+        if i % 2 == 0:
+            widget(at.slider, "Loss Given Default (LGD)").set_value(round(0.05 + (i * 7) % 20 * 0.05, 2))
+        else:
+            widget(at.slider, "EMI Tenure (months)").set_value(12 + (i * 29) % 349)
+        latencies.append(timed_run(at))
+    return 0, latencies
+
+def drive_batch(at, interactions, upload):
+    """Upload a portfolio and score it once (cold), then re-score it repeatedly"""
+    at.file_uploader[0].set_value(("portfolio.csv", upload, "text/csv"))
+    cold = timed_run(at)
+    widget(at.button, "🚀 Score All Customers").click()
+    cold += timed_run(at)
+
+    latencies = []
+    for _ in range(interactions):
+        widget(at.button, "🚀 Score All Customers").click()
+        latencies.append(timed_run(at))
+    return cold, latencies
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Streamlit rerun latency per page")
+    parser.add_argument('--rows', type=int, default=100000, help="rows in the synthetic dataset")
+    parser.add_argument('--upload-rows', type=int, default=None,
+                        help="rows in the uploaded CSV (default: same as --rows)")
+    parser.add_argument('--interactions', type=int, default=30, help="scripted reruns per page")
+    parser.add_argument('--budget-ms', type=float, default=300.0, help="p95 rerun latency budget")
+    parser.add_argument('--timeout', type=float, default=300.0, help="per-run timeout in seconds")
+    args = parser.parse_args()
+    if args.upload_rows is None:
+        args.upload_rows = args.rows
+
+    workdir = tempfile.mkdtemp(prefix='credit-bench-')
+    os.makedirs(os.path.join(workdir, 'data'))
+    make_portfolio(args.rows).to_csv(os.path.join(workdir, 'data', 'preprocessed_data.csv'), index=False)
+    upload = make_portfolio(args.upload_rows, seed=1).to_csv(index=False).encode()
+    os.chdir(workdir)
+
+    # The dashboard starts in approximate mode so its cold run times the progressive pass
+    pages = [
+        ('Analytics Dashboard', DASHBOARD, {'approximate_mode': True},
+         lambda at: drive_dashboard(at, args.interactions)),
+        ('Interest Rate Calculator', CALCULATOR, None, lambda at: drive_calculator(at, args.interactions)),
+        ('Batch Scoring', BATCH, None, lambda at: drive_batch(at, args.interactions, upload)),
+        ('Portfolio Risk Report', REPORT, None, lambda at: drive_report(at, args.interactions)),
+    ]
+
+    print(f"Dataset: {args.rows:,} rows | Upload: {args.upload_rows:,} rows | Budget: p95 <= {args.budget_ms:.0f} ms")
+    print(f"Dashboard first paint (first progressive estimate): {first_paint_ms():.0f} ms")
+    print(f"{'Page':<26}{'Cold':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'Max':>10}  Status")
+
+    within_budget = True
+    for name, page, state, drive in pages:
+        at, cold = open_page(page, args.timeout, state)
+        first_input, latencies = drive(at)
+        cold += first_input
+        latencies = np.array(latencies)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        ok = p95 <= args.budget_ms
+        within_budget &= ok
+        print(
+            f"{name:<26}{cold:>8.0f}ms{p50:>8.0f}ms{p95:>8.0f}ms{p99:>8.0f}ms{latencies.max():>8.0f}ms"
+            f"  {'OK' if ok else 'OVER BUDGET'}"
+        )
+
+    sys.exit(0 if within_budget else 1)
+
+if __name__ == "__main__":
+    main()
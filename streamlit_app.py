@@ -6,7 +6,12 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+import hashlib
+import io
 import pickle
+import time
 import warnings
 
 
@@ -299,6 +304,38 @@ def calculate_credit_score(row):
     
     return min(850, max(300, round(score)))
 
+def calculate_credit_scores(df):
+    """Calculate credit scores (300-850) for a whole DataFrame"""
+    delayed = df['Num_of_Delayed_Payment'].to_numpy(dtype=float)
+    delay_days = df['Delay_from_due_date'].to_numpy(dtype=float)
+    min_payment = df['Payment_of_Min_Amount'].to_numpy()
+    utilization = df['Credit_Utilization_Ratio'].to_numpy(dtype=float)
+    age_years = df['Credit_History_Age_Years'].to_numpy(dtype=float)
+    inquiries = df['Num_Credit_Inquiries'].to_numpy(dtype=float)
+    
+    # Payment History (35%)
+    payment_score = 297 - np.where(delayed > 0, delayed * 50, 0)
+    payment_score -= np.where(delay_days > 30, np.minimum(100, delay_days), 0)
+    payment_score -= np.where(min_payment == 1, 50, 0)
+    score = 300 + np.maximum(0, payment_score) * 0.35
+    
+    # Credit Utilization (30%)
+    utilization_score = 255 - np.where(utilization > 30, (utilization - 30) * 5, 0)
+    score += np.maximum(0, utilization_score) * 0.30
+    
+    # Credit Age (15%)
+    age_score = np.select([age_years < 2, age_years < 5], [50, 100], 127)
+    score += age_score * 0.15
+    
+    # Credit Mix (10%)
+    score += np.where(df['Credit_Mix'].to_numpy() == 'Good', 85, 50) * 0.10
+    
+    # New Inquiries (10%)
+    inquiry_score = 85 - np.where(inquiries > 10, (inquiries - 10) * 3, 0)
+    score += np.maximum(0, inquiry_score) * 0.10
+    
+    return pd.Series(np.clip(np.round(score), 300, 850).astype(int), index=df.index)
+
 def get_credit_tier(score):
     """Get credit tier from score"""
     if score >= 750:
@@ -312,6 +349,17 @@ def get_credit_tier(score):
     else:
         return 'Poor', '🔴'
 
+TIER_ORDER = ['Excellent', 'Very Good', 'Good', 'Fair', 'Poor']
+
+def get_credit_tiers(scores):
+    """Get credit tiers for a Series of scores"""
+    tiers = np.select(
+        [scores >= 750, scores >= 700, scores >= 650, scores >= 550],
+        TIER_ORDER[:4],
+        'Poor'
+    )
+    return pd.Series(tiers, index=scores.index)
+
 def calculate_default_probability(row, score):
     """Calculate default probability"""
     base_prob = 0.5
@@ -321,23 +369,34 @@ def calculate_default_probability(row, score):
     default_prob = (score_factor * 0.5 + payment_factor * 0.3 + util_factor * 0.2)
     return min(0.95, max(0.01, round(default_prob, 4)))
 
+def calculate_default_probabilities(df, scores):
+    """Calculate default probabilities for a whole DataFrame"""
+    score_factor = (850 - scores.to_numpy(dtype=float)) / 550
+    payment_factor = np.minimum(0.3, df['Num_of_Delayed_Payment'].to_numpy(dtype=float) * 0.05)
+    util_factor = np.maximum(0, (df['Credit_Utilization_Ratio'].to_numpy(dtype=float) - 30) / 100)
+    default_prob = score_factor * 0.5 + payment_factor * 0.3 + util_factor * 0.2
+    return pd.Series(np.clip(np.round(default_prob, 4), 0.01, 0.95), index=df.index)
+
+BASE_RATES = {
+    'Personal Loan': 10.5,
+    'Housing Loan': 7.5,
+    'Auto Loan': 8.0,
+    'Student Loan': 6.5,
+    'Other': 11.0
+}
+
+TIER_RATE_ADJUSTMENTS = {
+    'Excellent': -1.5,
+    'Very Good': -0.75,
+    'Good': 0,
+    'Fair': 2.5,
+    'Poor': 5.0
+}
+
 def calculate_interest_rate(credit_score, tier, loan_type='Personal Loan', income=0, debt=0):
     """Calculate interest rate based on risk"""
-    base_rates = {
-        'Personal Loan': 10.5,
-        'Housing Loan': 7.5,
-        'Auto Loan': 8.0,
-        'Student Loan': 6.5,
-        'Other': 11.0
-    }
-    base_rate = base_rates.get(loan_type, 11.0)
-    tier_adj = {
-        'Excellent': -1.5,
-        'Very Good': -0.75,
-        'Good': 0,
-        'Fair': 2.5,
-        'Poor': 5.0
-    }.get(tier, 0)
+    base_rate = BASE_RATES.get(loan_type, 11.0)
+    tier_adj = TIER_RATE_ADJUSTMENTS.get(tier, 0)
     
     dti_adj = 0
     if income > 0:
@@ -352,6 +411,19 @@ def calculate_interest_rate(credit_score, tier, loan_type='Personal Loan', incom
     rate = base_rate + tier_adj + dti_adj
     return round(max(3.0, min(25.0, rate)), 2)
 
+def calculate_interest_rates(tiers, loan_types, incomes, debts):
+    """Calculate interest rates for whole Series of loans"""
+    base_rate = loan_types.map(BASE_RATES).fillna(11.0).to_numpy(dtype=float)
+    tier_adj = tiers.map(TIER_RATE_ADJUSTMENTS).fillna(0).to_numpy(dtype=float)
+    
+    incomes = incomes.to_numpy(dtype=float)
+    debts = debts.to_numpy(dtype=float)
+    dti = np.divide(debts, incomes, out=np.zeros_like(debts), where=incomes > 0)
+    dti_adj = np.select([dti > 0.5, dti > 0.4, dti > 0.3], [3.0, 2.0, 1.0], 0)
+    
+    rate = base_rate + tier_adj + dti_adj
+    return pd.Series(np.round(np.clip(rate, 3.0, 25.0), 2), index=tiers.index)
+
 def calculate_emi(principal, annual_rate, months):
     """Calculate EMI"""
     if annual_rate == 0:
@@ -360,6 +432,19 @@ def calculate_emi(principal, annual_rate, months):
     emi = principal * (monthly_rate * (1 + monthly_rate) ** months) / ((1 + monthly_rate) ** months - 1)
     return round(emi, 2)
 
+def calculate_emis(principal, annual_rate, months):
+    """Calculate EMIs for whole Series of loans"""
+    monthly_rate = annual_rate.to_numpy(dtype=float) / 100 / 12
+    principal = principal.to_numpy(dtype=float)
+    growth = (1 + monthly_rate) ** months
+    with np.errstate(divide='ignore', invalid='ignore'):
+        emi = np.where(
+            monthly_rate == 0,
+            principal / months,
+            np.round(principal * (monthly_rate * growth) / (growth - 1), 2)
+        )
+    return pd.Series(emi, index=annual_rate.index)
+
 def generate_suggestions(row, score, tier):
     """Generate improvement suggestions"""
     suggestions = []
@@ -412,6 +497,496 @@ def generate_suggestions(row, score, tier):
     
     return suggestions
 
+# ============================================================================
+# INPUT VALIDATION
+# ============================================================================
+
+PORTFOLIO_SCHEMA = {
+    'Num_of_Delayed_Payment': {'kind': 'numeric', 'min': 0},
+    'Delay_from_due_date': {'kind': 'numeric'},
+    'Payment_of_Min_Amount': {'kind': 'binary'},
+    'Credit_Utilization_Ratio': {'kind': 'numeric', 'min': 0, 'max': 100},
+    'Credit_History_Age_Years': {'kind': 'numeric', 'min': 0},
+    'Credit_Mix': {'kind': 'category', 'values': ['Good', 'Standard', 'Bad']},
+    'Num_Credit_Inquiries': {'kind': 'numeric', 'min': 0},
+}
+
+# Extra columns the portfolio risk report needs on top of PORTFOLIO_SCHEMA
+REPORT_SCHEMA = {
+    'Outstanding_Debt': {'kind': 'numeric', 'min': 0},
+    'Annual_Income': {'kind': 'numeric', 'min': 0},
+}
+
+BINARY_VALUES = {
+    '1': 1, '1.0': 1, 'yes': 1, 'true': 1,
+    '0': 0, '0.0': 0, 'no': 0, 'false': 0,
+}
+
+def validate_portfolio(df, schema=PORTFOLIO_SCHEMA):
+    """Coerce and validate uploaded data; returns (valid, quarantined, missing_columns)"""
+    # A re-uploaded quarantine export carries stale report columns; rebuild them below
+    df = df.drop(columns=['Row', 'Errors'], errors='ignore')
+    missing = [col for col in schema if col not in df.columns]
+    if missing:
+        return df.iloc[0:0], df, missing
+
+    clean = df.copy()
+    issues = {}
+
+    for col, rule in schema.items():
+        values = df[col]
+        blank = values.isna()
+
+        # Columns read_csv already parsed as numbers skip the string round-trip
+        if pd.api.types.is_numeric_dtype(values) and rule['kind'] != 'category':
+            if rule['kind'] == 'binary':
+                issues[f"{col}: not yes/no"] = ~values.isin([0, 1]) & ~blank
+        else:
+            raw = values.astype(str).str.strip()
+            blank |= raw.isin(['', 'nan', 'NaN', 'None'])
+
+            if rule['kind'] == 'numeric':
+                values = pd.to_numeric(raw, errors='coerce')
+                issues[f"{col}: not numeric"] = values.isna() & ~blank
+            elif rule['kind'] == 'binary':
+                values = raw.str.lower().map(BINARY_VALUES)
+                issues[f"{col}: not yes/no"] = values.isna() & ~blank
+            else:
+                values = raw.str.title().where(raw.str.title().isin(rule['values']))
+                issues[f"{col}: not one of {'/'.join(rule['values'])}"] = values.isna() & ~blank
+
+        if 'min' in rule:
+            issues[f"{col}: below {rule['min']}"] = values < rule['min']
+        if 'max' in rule:
+            issues[f"{col}: above {rule['max']}"] = values > rule['max']
+        issues[f"{col}: missing"] = blank
+        clean[col] = values
+
+    issue_mask = pd.DataFrame(issues, index=df.index)
+    bad = issue_mask.any(axis=1).to_numpy()
+
+    # One string per bad row, built with a single boolean-matrix product
+    labels = pd.Index(issue_mask.columns) + '; '
+    errors = issue_mask[bad].dot(labels).str.rstrip('; ')
+
+    quarantined = df[bad].copy()
+    quarantined.insert(0, 'Row', quarantined.index + 2)
+    quarantined.insert(1, 'Errors', errors)
+    return clean[~bad], quarantined, []
+
+# ============================================================================
+# CHART AGGREGATION
+# ============================================================================
+
+SCORE_BINS = np.arange(300, 875, 25)
+UTILIZATION_BINS = np.arange(0, 105, 5)
+TIER_COLORS = {
+    'Excellent': '#2F6F3E',
+    'Very Good': '#5B9A68',
+    'Good': '#D2961A',
+    'Fair': '#D96C2C',
+    'Poor': '#B53A3A'
+}
+
+def build_chart_bins(df):
+    """Pre-aggregate scored data into fixed-size chart payloads"""
+    scores = df['Credit_Score'].to_numpy(dtype=float)
+    utilization = np.clip(df['Credit_Utilization_Ratio'].to_numpy(dtype=float), 0, 100)
+    
+    score_counts, _ = np.histogram(scores, bins=SCORE_BINS)
+    tier_counts = df['Credit_Tier'].value_counts().reindex(TIER_ORDER, fill_value=0)
+    density, _, _ = np.histogram2d(utilization, scores, bins=[UTILIZATION_BINS, SCORE_BINS])
+    
+    return {
+        'score_hist': pd.DataFrame({
+            'Score': (SCORE_BINS[:-1] + SCORE_BINS[1:]) / 2,
+            'Customers': score_counts
+        }),
+        'tiers': pd.DataFrame({'Tier': TIER_ORDER, 'Customers': tier_counts.to_numpy()}),
+        'density': density.astype(int)
+    }
+
+# Shared across reruns without copying; callers must treat the frame as read-only
+@st.cache_resource
+def scored_data_store():
+    """Process-wide slot for the scored dataset, its chart bins and exact KPIs"""
+    return {}
+
+def store_scored_data(df, scores, kpis=None):
+    """Attach scores and tiers to the dataset and cache it with its chart bins"""
+    df['Credit_Score'] = scores
+    df['Credit_Tier'] = get_credit_tiers(df['Credit_Score'])
+    scored_data_store().update(df=df, bins=build_chart_bins(df), kpis=kpis)
+
+def load_scored_data():
+    """Load dataset with credit scores, tiers and chart bins"""
+    store = scored_data_store()
+    if 'df' not in store:
+        df = load_data()
+        if df is None:
+            return None, None
+        store_scored_data(df, calculate_credit_scores(df))
+    return store['df'], store['bins']
+
+# ============================================================================
+# PROGRESSIVE ANALYTICS
+# ============================================================================
+
+def stratified_order(codes, seed=42):
+    """Row order in which every prefix is a proportional stratified sample"""
+    rng = np.random.default_rng(seed)
+    stratum_sizes = np.bincount(codes)
+    
+    # Shuffle, group by stratum, then interleave strata by relative position
+    rows = rng.permutation(len(codes))
+    rows = rows[np.argsort(codes[rows], kind='stable')]
+    starts = np.cumsum(stratum_sizes) - stratum_sizes
+    position = np.arange(len(rows)) - starts[codes[rows]]
+    return rows[np.argsort((position + 0.5) / stratum_sizes[codes[rows]], kind='stable')]
+
+def exact_kpis(df):
+    """KPIs of a fully scored dataset, in the same shape as progressive_kpis"""
+    default_probs = calculate_default_probabilities(df, df['Credit_Score'])
+    tier_counts = df['Credit_Tier'].value_counts()
+    return {
+        'processed': len(df),
+        'total': len(df),
+        'exact': True,
+        'avg_score': (float(df['Credit_Score'].mean()), 0.0),
+        'avg_default': (float(default_probs.mean()), 0.0),
+        'tiers': {tier: (float(tier_counts.get(tier, 0)), 0.0) for tier in TIER_ORDER}
+    }
+
+def progressive_kpis(df, strata_col='Credit_Mix', first_sample=20000, growth=4, z=1.96):
+    """Yield stratified KPI estimates with confidence intervals until exact.
+
+    The final (exact) update also carries every row's score under 'scores'.
+    """
+    total = len(df)
+    codes, _ = pd.factorize(df[strata_col], use_na_sentinel=False)
+    order = stratified_order(codes)
+    n_strata = codes.max() + 1 if total else 0
+    stratum_sizes = np.bincount(codes, minlength=n_strata)
+    n_tiers = len(TIER_ORDER)
+    
+    counts = np.zeros(n_strata)
+    sums = {key: np.zeros(n_strata) for key in ('score', 'score_sq', 'default', 'default_sq')}
+    tier_counts = np.zeros((n_strata, n_tiers))
+    all_scores = np.zeros(total, dtype=int)
+    
+    processed = 0
+    chunk = first_sample
+    while processed < total:
+        idx = order[processed:processed + chunk]
+        sample = df.iloc[idx]
+        scores = calculate_credit_scores(sample)
+        default_probs = calculate_default_probabilities(sample, scores).to_numpy()
+        tier_codes = pd.Categorical(get_credit_tiers(scores), categories=TIER_ORDER).codes
+        all_scores[idx] = scores.to_numpy()
+        scores = scores.to_numpy(dtype=float)
+        stratum = codes[idx]
+        
+        counts += np.bincount(stratum, minlength=n_strata)
+        sums['score'] += np.bincount(stratum, weights=scores, minlength=n_strata)
+        sums['score_sq'] += np.bincount(stratum, weights=scores ** 2, minlength=n_strata)
+        sums['default'] += np.bincount(stratum, weights=default_probs, minlength=n_strata)
+        sums['default_sq'] += np.bincount(stratum, weights=default_probs ** 2, minlength=n_strata)
+        tier_counts += np.bincount(
+            stratum * n_tiers + tier_codes, minlength=n_strata * n_tiers
+        ).reshape(n_strata, n_tiers)
+        
+        processed += len(idx)
+        chunk *= growth
+        
+        # Stratified estimator with finite population correction
+        seen = counts > 0
+        n_h = counts[seen]
+        weights = stratum_sizes[seen] / stratum_sizes[seen].sum()
+        fpc = 1 - n_h / stratum_sizes[seen]
+        dof = np.maximum(n_h - 1, 1)
+        
+        def estimate(total_key, sq_key):
+            means = sums[total_key][seen] / n_h
+            variances = np.maximum(0, sums[sq_key][seen] - n_h * means ** 2) / dof
+            half_width = z * np.sqrt(np.sum(weights ** 2 * variances / n_h * fpc))
+            return float(np.sum(weights * means)), float(half_width)
+        
+        shares = tier_counts[seen] / n_h[:, None]
+        share_var = (weights ** 2 * fpc / dof)[:, None] * shares * (1 - shares)
+        tier_estimates = total * (weights @ shares)
+        tier_half_widths = total * z * np.sqrt(share_var.sum(axis=0))
+        
+        kpis = {
+            'processed': processed,
+            'total': total,
+            'exact': processed >= total,
+            'avg_score': estimate('score', 'score_sq'),
+            'avg_default': estimate('default', 'default_sq'),
+            'tiers': {
+                tier: (float(tier_estimates[i]), float(tier_half_widths[i]))
+                for i, tier in enumerate(TIER_ORDER)
+            }
+        }
+        if kpis['exact']:
+            kpis['scores'] = pd.Series(all_scores, index=df.index)
+        yield kpis
+
+# ============================================================================
+# PORTFOLIO RISK REPORT
+# ============================================================================
+
+LOAN_TYPE_ALIASES = {
+    'Personal Loan': 'Personal Loan',
+    'Mortgage Loan': 'Housing Loan',
+    'Home Equity Loan': 'Housing Loan',
+    'Housing Loan': 'Housing Loan',
+    'Auto Loan': 'Auto Loan',
+    'Student Loan': 'Student Loan'
+}
+
+def normalize_loan_types(loan_types):
+    """Map free-text loan descriptions onto the calculator's loan types"""
+    # Missing types become '' and fall through to 'Other', like unknown ones
+    codes, uniques = pd.factorize(loan_types, use_na_sentinel=False)
+    primary = pd.Series(uniques, dtype=object).fillna('').astype(str)
+    primary = primary.str.split(',').str[0].str.strip().str.replace(r'^and\s+', '', regex=True)
+    mapped = primary.map(LOAN_TYPE_ALIASES).fillna('Other').to_numpy()
+    return pd.Series(mapped[codes], index=loan_types.index)
+
+def herfindahl(exposure):
+    """Herfindahl-Hirschman index of exposure shares (0-10,000)"""
+    shares = exposure / exposure.sum()
+    return float((shares ** 2).sum() * 10000)
+
+def prepare_portfolio(df):
+    """Everything in the portfolio report that depends on neither LGD nor EMI tenure
+
+    Expects Outstanding_Debt and Annual_Income already validated against REPORT_SCHEMA.
+    """
+    if 'Type_of_Loan' in df.columns:
+        loan_types = normalize_loan_types(df['Type_of_Loan'])
+    else:
+        loan_types = pd.Series('Personal Loan', index=df.index)
+    
+    if 'Default_Probability' in df.columns:
+        default_probs = df['Default_Probability']
+    else:
+        default_probs = calculate_default_probabilities(df, df['Credit_Score'])
+    
+    loans = pd.DataFrame({
+        'Credit_Tier': pd.Categorical(df['Credit_Tier'], categories=TIER_ORDER),
+        'Loan_Type': loan_types,
+        'Exposure': df['Outstanding_Debt'].to_numpy(dtype=float)
+    })
+    
+    # Expected loss is linear in LGD, so segments keep PD x exposure and scale it later
+    loans['PD_x_Exposure'] = default_probs.to_numpy() * loans['Exposure']
+    loans['Interest_Rate'] = calculate_interest_rates(
+        df['Credit_Tier'], loans['Loan_Type'], df['Annual_Income'], loans['Exposure']
+    )
+    loans['Rate_x_Exposure'] = loans['Interest_Rate'] * loans['Exposure']
+    
+    grouped = loans.groupby(['Credit_Tier', 'Loan_Type'], observed=True)
+    segments = grouped.agg(
+        Loans=('Exposure', 'size'),
+        Exposure=('Exposure', 'sum'),
+        PD_x_Exposure=('PD_x_Exposure', 'sum'),
+        Rate_x_Exposure=('Rate_x_Exposure', 'sum')
+    )
+    
+    # Concentration is per borrower: a customer with several loans is one name.
+    # Names are not unique, so without Customer_ID each loan counts as its own borrower
+    if 'Customer_ID' in df.columns:
+        borrowers = loans['Exposure'].groupby(df['Customer_ID'].to_numpy(), sort=False, dropna=False).sum()
+    else:
+        borrowers = loans['Exposure']
+    exposure = borrowers.to_numpy()
+    top_count = max(1, len(exposure) // 100)
+    top_exposure = np.partition(exposure, len(exposure) - top_count)[-top_count:].sum() if len(exposure) else 0
+    total_exposure = exposure.sum()
+    
+    tier_exposure = segments['Exposure'].groupby(level='Credit_Tier', observed=True).sum()
+    type_exposure = segments['Exposure'].groupby(level='Loan_Type').sum()
+    
+    return {
+        # Per-loan inputs of the EMI step, with each loan's row in segments
+        'exposure': loans['Exposure'],
+        'rates': loans['Interest_Rate'],
+        'segment_codes': grouped.ngroup().to_numpy(),
+        'segments': segments,
+        'concentration': {
+            'Top 1% Borrowers Share': top_exposure / total_exposure if total_exposure else 0,
+            'Single-Name HHI': herfindahl(borrowers) if total_exposure else 0,
+            'Tier HHI': herfindahl(tier_exposure) if total_exposure else 0,
+            'Loan Type HHI': herfindahl(type_exposure) if total_exposure else 0
+        }
+    }
+
+def segment_emis(portfolio, tenure_months):
+    """Total monthly EMI of each segment for one loan tenure"""
+    emis = calculate_emis(portfolio['exposure'], portfolio['rates'], tenure_months)
+    return np.bincount(portfolio['segment_codes'], weights=emis.to_numpy(), minlength=len(portfolio['segments']))
+
+def build_portfolio_report(portfolio, lgd, monthly_emis):
+    """Expected loss, risk-adjusted yield and concentration for a prepared portfolio"""
+    segments = portfolio['segments'].copy()
+    segments['Expected_Loss'] = segments.pop('PD_x_Exposure') * lgd
+    segments['Monthly_EMI'] = monthly_emis
+    total_exposure = segments['Exposure'].sum()
+    
+    def summarize(keys):
+        grouped = segments.groupby(level=keys, observed=True).sum()
+        exposure = grouped['Exposure'].where(grouped['Exposure'] > 0)
+        grouped['Avg_Rate_%'] = (grouped.pop('Rate_x_Exposure') / exposure).round(2)
+        grouped['EL_Rate_%'] = (grouped['Expected_Loss'] / exposure * 100).round(2)
+        grouped['Risk_Adj_Yield_%'] = grouped['Avg_Rate_%'] - grouped['EL_Rate_%']
+        grouped['Exposure_Share_%'] = (grouped['Exposure'] / total_exposure * 100).round(2)
+        return grouped.reset_index()
+    
+    total_loss = segments['Expected_Loss'].sum()
+    el_rate = total_loss / total_exposure if total_exposure else 0
+    avg_rate = segments['Rate_x_Exposure'].sum() / total_exposure if total_exposure else 0
+    
+    return {
+        'total_exposure': total_exposure,
+        'expected_loss': total_loss,
+        'el_rate': el_rate,
+        'avg_rate': avg_rate,
+        'risk_adjusted_yield': avg_rate - el_rate * 100,
+        'monthly_emi': segments['Monthly_EMI'].sum(),
+        'by_tier': summarize('Credit_Tier'),
+        'by_loan_type': summarize('Loan_Type'),
+        'by_segment': summarize(['Credit_Tier', 'Loan_Type']),
+        'concentration': portfolio['concentration']
+    }
+
+# ============================================================================
+# PAGE MEMOIZATION
+# ============================================================================
+
+@st.cache_resource
+def load_customer_index():
+    """Map each customer name to its first row in the scored dataset"""
+    df, _ = load_scored_data()
+    if df is None:
+        return [], {}
+    first = ~df['Name'].duplicated()
+    names = df['Name'][first].tolist()
+    return names, dict(zip(names, np.flatnonzero(first.to_numpy())))
+
+def upload_digest(uploaded_file):
+    """Content digest of an uploaded file, computed once per upload"""
+    key = f"upload_digest_{uploaded_file.file_id}"
+    if key not in st.session_state:
+        st.session_state[key] = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+    return st.session_state[key]
+
+# Upload caches are keyed on the digest alone and shared without copying;
+# callers must treat the returned frames as read-only
+@st.cache_resource(max_entries=4)
+def validate_upload(digest, _uploaded_file):
+    """Read and validate an uploaded CSV"""
+    df = pd.read_csv(io.BytesIO(_uploaded_file.getvalue()))
+    start = time.perf_counter()
+    df, quarantined, missing_columns = validate_portfolio(df)
+    return df, quarantined, missing_columns, time.perf_counter() - start
+
+@st.cache_resource(max_entries=4)
+def score_upload(digest, _uploaded_file):
+    """Score the valid rows of an uploaded CSV"""
+    df = validate_upload(digest, _uploaded_file)[0].copy()
+    start = time.perf_counter()
+    df['Credit_Score'] = calculate_credit_scores(df)
+    df['Credit_Tier'] = get_credit_tiers(df['Credit_Score'])
+    df['Default_Probability'] = calculate_default_probabilities(df, df['Credit_Score'])
+    return df, time.perf_counter() - start
+
+@st.cache_resource(max_entries=4)
+def export_upload_csv(digest, _uploaded_file, scored=True):
+    """CSV export of the scored or quarantined rows of an uploaded CSV"""
+    if scored:
+        df = score_upload(digest, _uploaded_file)[0]
+    else:
+        df = validate_upload(digest, _uploaded_file)[1]
+    return df.to_csv(index=False)
+
+@st.cache_resource(max_entries=4)
+def portfolio_base(digest, _uploaded_file):
+    """Prepared report inputs for an uploaded CSV, or the default dataset when digest is None.
+
+    Returns (portfolio, excluded_rows, missing_columns).
+    """
+    if digest is None:
+        df, _ = load_scored_data()
+        quarantined = 0
+    else:
+        df = score_upload(digest, _uploaded_file)[0]
+        quarantined = len(validate_upload(digest, _uploaded_file)[1])
+    if df is None:
+        return None, {}, []
+    
+    df, invalid, missing_columns = validate_portfolio(df, REPORT_SCHEMA)
+    if missing_columns:
+        return None, {}, missing_columns
+    
+    excluded_rows = {'Scoring validation': quarantined, 'Exposure/income validation': len(invalid)}
+    return prepare_portfolio(df), excluded_rows, []
+
+@st.cache_data(max_entries=16)
+def portfolio_emis(digest, _uploaded_file, tenure_months):
+    """Monthly EMI per segment; only a new tenure reprices the individual loans"""
+    return segment_emis(portfolio_base(digest, _uploaded_file)[0], tenure_months)
+
+def portfolio_report(digest, _uploaded_file, lgd, tenure_months):
+    """Portfolio report; LGD and tenure only rescale the cached portfolio_base.
+
+    Returns (report, excluded_rows, missing_columns).
+    """
+    portfolio, excluded_rows, missing_columns = portfolio_base(digest, _uploaded_file)
+    if portfolio is None:
+        return None, excluded_rows, missing_columns
+    monthly_emis = portfolio_emis(digest, _uploaded_file, tenure_months)
+    return build_portfolio_report(portfolio, lgd, monthly_emis), excluded_rows, []
+
+@st.cache_resource(max_entries=16)
+def build_report_figure(digest, lgd, _by_segment):
+    """Expected loss chart; it depends on the upload and LGD but not on the EMI tenure"""
+    return px.bar(
+        _by_segment, x='Credit_Tier', y='Expected_Loss', color='Loan_Type',
+        title="⚠️ Expected Loss by Tier and Loan Type"
+    )
+
+@st.cache_resource
+def build_dashboard_figures():
+    """Build the dashboard charts once from the cached chart bins"""
+    _, chart_bins = load_scored_data()
+    
+    score_fig = px.bar(
+        chart_bins['score_hist'], x='Score', y='Customers',
+        title="📊 Score Distribution"
+    )
+    score_fig.update_traces(marker_color='#265A88', width=22)
+    
+    tier_fig = px.bar(
+        chart_bins['tiers'], x='Tier', y='Customers', color='Tier',
+        color_discrete_map=TIER_COLORS, title="🏷️ Tier Breakdown"
+    )
+    tier_fig.update_layout(showlegend=False)
+    
+    density_fig = go.Figure(go.Heatmap(
+        z=chart_bins['density'],
+        x=(SCORE_BINS[:-1] + SCORE_BINS[1:]) / 2,
+        y=(UTILIZATION_BINS[:-1] + UTILIZATION_BINS[1:]) / 2,
+        colorscale='Blues',
+        colorbar=dict(title="Customers")
+    ))
+    density_fig.update_layout(
+        title="🔥 Credit Utilization vs Score",
+        xaxis_title="Credit Score",
+        yaxis_title="Credit Utilization (%)"
+    )
+    return score_fig, tier_fig, density_fig
+
 # ============================================================================
 # MAIN APP
 # ============================================================================
@@ -435,6 +1010,7 @@ def main():
             "📉 Analytics Dashboard 💡 Recommendations",
             "📈 Batch Scoring", 
             "💰 Interest Rate Calculator",
+            "🏦 Portfolio Risk Report",
             "ℹ️ About"
         ],
         label_visibility="collapsed"
@@ -456,42 +1032,51 @@ def main():
             uploaded_file = st.file_uploader("📁 Choose CSV file", type="csv", help="Upload customer data CSV file")
         
         if uploaded_file is not None:
-            df = pd.read_csv(uploaded_file)
-            st.markdown(f"**✓ File loaded:** {len(df)} records found")
+            digest = upload_digest(uploaded_file)
+            df, quarantined, missing_columns, validation_time = validate_upload(digest, uploaded_file)
+            st.markdown(f"**✓ File loaded:** {len(df) + len(quarantined)} records found")
+            
+            if missing_columns:
+                st.error(f"⚠️ Missing required columns: {', '.join(missing_columns)}")
+                st.stop()
             
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("📊 Total Records", len(df))
+                st.metric("📊 Total Records", len(df) + len(quarantined))
             with col2:
-                st.metric("📋 Columns", len(df.columns))
+                st.metric("✅ Valid Records", len(df))
             with col3:
-                st.metric("✅ Status", "Ready to Score")
+                st.metric("🚫 Quarantined", len(quarantined))
+            
+            if len(quarantined) > 0:
+                with st.expander(f"⚠️ {len(quarantined)} rows quarantined - view error report"):
+                    st.dataframe(quarantined[['Row', 'Errors']], use_container_width=True)
+                    st.download_button(
+                        label="📥 Download Quarantined Rows",
+                        data=lambda: export_upload_csv(digest, uploaded_file, scored=False),
+                        file_name="quarantined_rows.csv",
+                        mime="text/csv",
+                        use_container_width=True
+                    )
             
             st.markdown("---")
             
             if st.button("🚀 Score All Customers", use_container_width=True):
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                
                 with st.spinner("🔄 Processing customers..."):
-                    df['Credit_Score'] = df.apply(calculate_credit_score, axis=1)
-                    progress_bar.progress(33)
-                    status_text.info("✓ Credit scores calculated")
-                    
-                    df['Credit_Tier'] = df['Credit_Score'].apply(lambda x: get_credit_tier(x)[0])
-                    progress_bar.progress(66)
-                    status_text.info("✓ Credit tiers assigned")
-                    
-                    df['Default_Probability'] = df.apply(
-                        lambda row: calculate_default_probability(row, row['Credit_Score']), axis=1
-                    )
-                    progress_bar.progress(100)
-                    status_text.success(f"✅ Successfully scored {len(df)} customers!")
+                    df, scoring_time = score_upload(digest, uploaded_file)
+                st.success(f"✅ Successfully scored {len(df)} customers!")
+                
+                overhead = validation_time / scoring_time if scoring_time > 0 else 0
+                st.caption(
+                    f"⏱️ Validation {validation_time * 1000:.1f} ms vs scoring {scoring_time * 1000:.1f} ms "
+                    f"({overhead:.1%} overhead)"
+                )
                 
                 st.markdown("---")
                 st.subheader("📊 Sample Results (First 10)")
                 st.dataframe(
-                    df[['Customer_ID', 'Name', 'Credit_Score', 'Credit_Tier', 'Default_Probability']].head(10),
+                    df[[col for col in ['Customer_ID', 'Name', 'Credit_Score', 'Credit_Tier', 'Default_Probability']
+                        if col in df.columns]].head(10),
                     use_container_width=True
                 )
                 
@@ -512,11 +1097,10 @@ def main():
                 
                 st.markdown("---")
                 
-                # Download results
-                csv = df.to_csv(index=False)
+                # Download results (built only when clicked, not on every rerun)
                 st.download_button(
                     label="📥 Download Full Results",
-                    data=csv,
+                    data=lambda: export_upload_csv(digest, uploaded_file),
                     file_name="credit_scores.csv",
                     mime="text/csv",
                     use_container_width=True
@@ -533,37 +1117,103 @@ def main():
         st.markdown("Comprehensive portfolio insights and analysis")
         st.markdown("---")
         
-        df = load_data()
+        approximate = st.toggle(
+            "⚡ Approximate mode",
+            key="approximate_mode",
+            help="Show sample-based KPIs with 95% confidence intervals first, then refine until exact"
+        )
         
-        if df is not None:
-            df['Credit_Score'] = df.apply(calculate_credit_score, axis=1)
-            df['Credit_Tier'] = df['Credit_Score'].apply(lambda x: get_credit_tier(x)[0])
+        # A cold store always goes through the progressive pass, so the first paint
+        # shows estimates instead of waiting for the full dataset to be scored
+        store = scored_data_store()
+        progressive = approximate or 'df' not in store
+        
+        if progressive:
+            # With the scored dataset already cached, exact KPIs are available immediately
+            if 'df' in store:
+                if store['kpis'] is None:
+                    store['kpis'] = exact_kpis(store['df'])
+                kpi_updates = [store['kpis']]
+            else:
+                raw_df = load_data()
+                kpi_updates = progressive_kpis(raw_df) if raw_df is not None else []
             
+            if kpi_updates:
+                progress_bar = st.progress(0)
+                kpi_slot = st.empty()
+                
+                for kpis in kpi_updates:
+                    avg_score, score_ci = kpis['avg_score']
+                    avg_default, default_ci = kpis['avg_default']
+                    excellent, excellent_ci = kpis['tiers']['Excellent']
+                    poor, poor_ci = kpis['tiers']['Poor']
+                    
+                    with kpi_slot.container():
+                        col1, col2, col3, col4, col5 = st.columns(5)
+                        with col1:
+                            st.metric("👥 Processed", f"{kpis['processed']:,} / {kpis['total']:,}")
+                        with col2:
+                            st.metric("📊 Avg Score", f"{avg_score:.0f} ± {score_ci:.1f}")
+                        with col3:
+                            st.metric("⚠️ Avg Default Risk", f"{avg_default:.2%} ± {default_ci:.2%}")
+                        with col4:
+                            st.metric("🟢 Excellent Tier", f"{excellent:,.0f} ± {excellent_ci:,.0f}")
+                        with col5:
+                            st.metric("🔴 Poor Tier", f"{poor:,.0f} ± {poor_ci:,.0f}")
+                        
+                        if kpis['exact']:
+                            if 'scores' in kpis:
+                                # Cache the progressive pass's scores instead of rescoring the dataset
+                                store_scored_data(raw_df, kpis.pop('scores'), kpis)
+                            st.caption("✅ Exact values computed on the full dataset")
+                        else:
+                            st.caption("⏳ Estimates from a stratified sample (95% confidence) - refining...")
+                    
+                    progress_bar.progress(kpis['processed'] / kpis['total'])
+                
+                progress_bar.empty()
+        
+        df, chart_bins = load_scored_data()
+        
+        if df is not None:
             # KPIs
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("👥 Total Customers", f"{len(df):,}")
-            with col2:
-                st.metric("📊 Avg Score", f"{df['Credit_Score'].mean():.0f}/850")
-            with col3:
-                excellent = len(df[df['Credit_Tier'] == 'Excellent'])
-                st.metric("🟢 Excellent Tier", excellent)
-            with col4:
-                poor = len(df[df['Credit_Tier'] == 'Poor'])
-                st.metric("🔴 Poor Tier", poor)
+            if not progressive:
+                tier_counts = chart_bins['tiers'].set_index('Tier')['Customers']
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("👥 Total Customers", f"{len(df):,}")
+                with col2:
+                    st.metric("📊 Avg Score", f"{df['Credit_Score'].mean():.0f}/850")
+                with col3:
+                    st.metric("🟢 Excellent Tier", tier_counts['Excellent'])
+                with col4:
+                    st.metric("🔴 Poor Tier", tier_counts['Poor'])
             
             st.markdown("---")
             
+            score_fig, tier_fig, density_fig = build_dashboard_figures()
+            
             col1, col2 = st.columns(2)
-                      
+            
+            with col1:
+                st.plotly_chart(score_fig, use_container_width=True)
+            
+            with col2:
+                st.plotly_chart(tier_fig, use_container_width=True)
+            
+            st.plotly_chart(density_fig, use_container_width=True)
+            
+            st.markdown("---")
+        
         
         if df is not None:
+            customer_names, customer_rows = load_customer_index()
             customer = st.selectbox(
                 "🔍 Select Customer",
-                df['Name'].unique(),
+                customer_names,
                 label_visibility="visible"
             )
-            customer_row = df[df['Name'] == customer].iloc[0]
+            customer_row = df.iloc[customer_rows[customer]]
             
             score = calculate_credit_score(customer_row)
             tier, emoji = get_credit_tier(score)
@@ -696,7 +1346,96 @@ def main():
             st.success(f"✅ EMI calculated successfully!")
     
     # ====================================================================
-    # PAGE 5: ABOUT (ENHANCED)
+    # PAGE 5: PORTFOLIO RISK REPORT
+    # ====================================================================
+    
+    elif page == "🏦 Portfolio Risk Report":
+        st.header("🏦 Portfolio Expected Loss & Pricing")
+        st.markdown("Expected loss (PD × exposure × LGD), risk-adjusted yield and concentration for the whole book")
+        st.markdown("---")
+        
+        col1, col2, col3 = st.columns([2, 1, 1])
+        
+        with col1:
+            uploaded_file = st.file_uploader(
+                "📁 Portfolio CSV (optional)", type="csv",
+                help="Leave empty to report on the default dataset. Outstanding_Debt is used as exposure."
+            )
+        with col2:
+            lgd = st.slider("Loss Given Default (LGD)", 0.05, 1.0, 0.45, step=0.05)
+        with col3:
+            tenure_months = st.slider("EMI Tenure (months)", 12, 360, 60)
+        
+        digest = upload_digest(uploaded_file) if uploaded_file is not None else None
+        missing_columns = validate_upload(digest, uploaded_file)[2] if digest is not None else []
+        if missing_columns:
+            st.error(f"⚠️ Missing required columns: {', '.join(missing_columns)}")
+            st.stop()
+        
+        report, excluded_rows, missing_columns = portfolio_report(digest, uploaded_file, lgd, tenure_months)
+        if missing_columns:
+            st.error(f"⚠️ Missing required columns: {', '.join(missing_columns)}")
+            st.stop()
+        
+        if report is not None:
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("💼 Total Exposure", f"₹{report['total_exposure']:,.0f}")
+            with col2:
+                st.metric("⚠️ Expected Loss", f"₹{report['expected_loss']:,.0f}", f"{report['el_rate']:.2%} of exposure",
+                          delta_color="inverse")
+            with col3:
+                st.metric("📈 Avg Rate", f"{report['avg_rate']:.2f}%")
+            with col4:
+                st.metric("✅ Risk-Adjusted Yield", f"{report['risk_adjusted_yield']:.2f}%")
+            
+            excluded = sum(excluded_rows.values())
+            if excluded > 0:
+                details = ", ".join(f"{count:,} failed {reason.lower()}" for reason, count in excluded_rows.items() if count)
+                st.warning(f"⚠️ {excluded:,} rows excluded from this report ({details})")
+            else:
+                st.caption("✅ All rows included in this report")
+            
+            st.markdown("---")
+            
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.subheader("🏷️ By Credit Tier")
+                st.dataframe(report['by_tier'], use_container_width=True, hide_index=True)
+            
+            with col2:
+                st.subheader("🏦 By Loan Type")
+                st.dataframe(report['by_loan_type'], use_container_width=True, hide_index=True)
+            
+            fig = build_report_figure(digest, lgd, report['by_segment'])
+            st.plotly_chart(fig, use_container_width=True)
+            
+            st.subheader("🎯 Concentration")
+            col1, col2, col3, col4 = st.columns(4)
+            concentration = report['concentration']
+            with col1:
+                st.metric("🔝 Top 1% Borrowers", f"{concentration['Top 1% Borrowers Share']:.1%}")
+            with col2:
+                st.metric("👤 Single-Name HHI", f"{concentration['Single-Name HHI']:,.1f}")
+            with col3:
+                st.metric("🏷️ Tier HHI", f"{concentration['Tier HHI']:,.0f}")
+            with col4:
+                st.metric("🏦 Loan Type HHI", f"{concentration['Loan Type HHI']:,.0f}")
+            
+            with st.expander("📋 Tier × Loan Type Breakdown"):
+                st.dataframe(report['by_segment'], use_container_width=True, hide_index=True)
+            
+            st.download_button(
+                label="📥 Download Segment Report",
+                data=report['by_segment'].to_csv(index=False),
+                file_name="portfolio_risk_report.csv",
+                mime="text/csv",
+                use_container_width=True
+            )
+    
+    # ====================================================================
+    # PAGE 6: ABOUT (ENHANCED)
     # ====================================================================
     
     elif page == "ℹ️ About":
@@ -720,6 +1459,7 @@ def main():
             - ✅ **Personalized Recommendations** - Actionable improvement suggestions
             - ✅ **Batch Processing** - Score multiple customers simultaneously
             - ✅ **Portfolio Analytics** - Comprehensive dashboard and insights
+            - ✅ **Portfolio Risk Report** - Expected loss, risk-adjusted yield and concentration
             
             ### 🔧 Technology Stack
             